@@ -0,0 +1,288 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+import torch
+import whisper
+import wavio
+
+from speechremover import censor_original_audio
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+CHECKPOINT_FILENAME = "checkpoint.jsonl"
+
+# Per-worker state. Set once by _init_worker so that every process in the pool
+# loads the whisper model a single time, rather than once per file.
+_worker_model = None
+_worker_blacklist = None
+_worker_error = None
+
+def load_blacklist(blacklist_path: str) -> set:
+    """Loads a blacklist file, one phrase/word per line, into a set."""
+    with open(blacklist_path, "r") as blf:
+        return {line.strip() for line in blf if line.strip()}
+
+def collect_audio_files(source: str, exclude: tuple = ()) -> list:
+    """Function that builds the list of audio files to censor.
+
+    Parameters
+    ----------
+    source: str
+        Either a directory, which is searched recursively for audio files, or a
+        manifest text file with one audio file path per line. Relative paths in a
+        manifest are taken relative to the manifest's directory.
+    exclude: tuple
+        Paths to leave out, e.g. the output directory and checkpoint. Excluded
+        directories are not searched.
+
+    Returns
+    ----------
+    A sorted list of (absolute input path, output name) tuples, where output name
+    is the path (without extension) the outputs for that file should be written
+    to, relative to the output directory.
+
+    Raises
+    ----------
+    ValueError if two input files would be written to the same outputs.
+    """
+
+    # Otherwise an output directory inside the source would have its censored
+    # files picked up as new inputs on the next run.
+    exclude = {os.path.abspath(path) for path in exclude}
+
+    files = []
+    if os.path.isdir(source):
+        for root, dirnames, filenames in os.walk(source):
+            dirnames[:] = [dirname for dirname in dirnames if os.path.abspath(os.path.join(root, dirname)) not in exclude]
+            for filename in filenames:
+                if filename.lower().endswith(AUDIO_EXTENSIONS):
+                    path = os.path.abspath(os.path.join(root, filename))
+                    if path in exclude:
+                        continue
+                    # Keep the directory structure so equally named clips in
+                    # different folders don't overwrite each other.
+                    files.append((path, os.path.splitext(os.path.relpath(path, source))[0]))
+    else:
+        manifest_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, "r") as mf:
+            for line in mf:
+                path = line.strip()
+                if not path or path.startswith("#"):
+                    continue
+                path = os.path.abspath(os.path.join(manifest_dir, path))
+                if path in exclude or any(path.startswith(excluded + os.sep) for excluded in exclude):
+                    continue
+                # Same as above, keep the structure relative to the manifest. Files
+                # outside of the manifest's directory fall back to their basename.
+                name = os.path.relpath(path, manifest_dir)
+                if name.startswith(os.pardir):
+                    name = os.path.basename(path)
+                files.append((path, os.path.splitext(name)[0]))
+
+    # Different extensions (or basenames, for files outside of the manifest
+    # directory) can still map to the same outputs.
+    outputs = {}
+    for path, name in files:
+        if name in outputs and outputs[name] != path:
+            raise ValueError(f"{outputs[name]} and {path} would both be written to {name}_censored.wav")
+        outputs[name] = path
+    return sorted(set(files))
+
+def load_checkpoint(checkpoint_path: str) -> dict:
+    """Reads the checkpoint manifest and returns a dict mapping each finished input
+    path to its checkpoint entry. A partially written final line (from an
+    interrupted run) is ignored, see _prepare_checkpoint."""
+
+    finished = {}
+    if not os.path.exists(checkpoint_path):
+        return finished
+    with open(checkpoint_path, "r") as cf:
+        for line in cf:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            finished[os.path.abspath(entry["input"])] = entry
+    return finished
+
+def _prepare_checkpoint(checkpoint_path: str):
+    """Terminates a partially written final line left by an interrupted run, so
+    that the next entry appended to the checkpoint starts on its own line."""
+
+    if not os.path.exists(checkpoint_path) or os.path.getsize(checkpoint_path) == 0:
+        return
+    with open(checkpoint_path, "rb+") as cf:
+        cf.seek(-1, os.SEEK_END)
+        if cf.read(1) != b"\n":
+            cf.write(b"\n")
+
+def _init_worker(model_name: str, blacklist: set, num_threads: int):
+    """Pool initializer that loads the model once per worker.
+
+    Exceptions must not escape from here: multiprocessing.Pool would keep
+    respawning the failing worker forever. Instead the error is stored and
+    reported for every file the worker is handed."""
+    global _worker_model, _worker_blacklist, _worker_error
+    try:
+        # Without this every worker's torch uses all of the cores.
+        torch.set_num_threads(num_threads)
+        _worker_model = whisper.load_model(model_name)
+        _worker_blacklist = blacklist
+    except Exception as e:
+        _worker_error = f"Worker failed to start: {type(e).__name__}: {e}"
+
+def censor_file(input_path: str, output_base: str) -> dict:
+    """Function that censors a single audio file using the worker's model, and
+    writes the censored audio and a JSON of detections next to output_base.
+
+    Parameters
+    ----------
+    input_path: str
+        Path of the audio file to censor.
+    output_base: str
+        Output path without extension. "_censored.wav" and "_detections.json" are
+        appended to it.
+
+    Returns
+    ----------
+    A checkpoint entry dict describing the finished file.
+    """
+
+    start = time.time()
+    os.makedirs(os.path.dirname(output_base) or ".", exist_ok=True)
+
+    # whisper.load_audio resamples to the model's 16 KHz, so the same array is
+    # both the model input and the audio that gets censored.
+    samplerate = whisper.audio.SAMPLE_RATE
+    audio = whisper.load_audio(input_path)
+    censored_audio, detections = censor_original_audio(original_audio=np.copy(audio), original_audio_samplerate=samplerate,
+                                                       model_audio=audio, model_audio_samplerate=samplerate,
+                                                       blacklist=_worker_blacklist, model=_worker_model,
+                                                       return_detections=True)
+
+    censored_path = output_base + "_censored.wav"
+    detections_path = output_base + "_detections.json"
+    wavio.write(censored_path, censored_audio, samplerate, sampwidth=4)
+    with open(detections_path, "w") as df:
+        json.dump({"input": input_path, "detections": detections}, df, indent=4)
+
+    return {"input": input_path, "censored": censored_path, "detections": detections_path,
+            "num_detections": len(detections), "seconds": time.time() - start}
+
+def _censor_file_task(task: tuple) -> tuple:
+    """Wrapper around censor_file for the pool, so that one bad file doesn't take
+    down the whole run. Returns (input path, entry or None, error or None)."""
+    input_path, output_base = task
+    if _worker_error is not None:
+        return input_path, None, _worker_error
+    try:
+        return input_path, censor_file(input_path, output_base), None
+    except Exception as e:
+        return input_path, None, f"{type(e).__name__}: {e}"
+
+def censor_corpus(source: str, output_dir: str, blacklist_path: str, model_name: str = "base.en",
+                  workers: int = 1, checkpoint_path: str = None, threads_per_worker: int = None) -> dict:
+    """Function that censors every audio file from a directory or manifest over a
+    pool of worker processes, each with its own persistent whisper model.
+
+    Finished files are appended to a checkpoint manifest (JSON lines) as soon as
+    they complete, so re-running the same command after an interruption skips
+    everything that was already done.
+
+    Parameters
+    ----------
+    source: str
+        Directory or manifest of audio files (see collect_audio_files).
+    output_dir: str
+        Directory the censored audio and detection JSON files are written to.
+    blacklist_path: str
+        File of blacklisted words, one per line.
+    model_name: str
+        Name of the whisper model each worker loads.
+    workers: int
+        Number of worker processes.
+    checkpoint_path: str
+        Checkpoint manifest location. Defaults to checkpoint.jsonl in output_dir.
+    threads_per_worker: int
+        Number of torch threads each worker uses. Defaults to splitting the cores
+        evenly between the workers.
+
+    Returns
+    ----------
+    A dict with the number of "completed", "skipped" and "failed" files.
+    """
+
+    # Check everything the workers need up front, a worker that can't start
+    # would only fail each of its files.
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    if threads_per_worker is not None and threads_per_worker < 1:
+        raise ValueError(f"threads_per_worker must be at least 1, got {threads_per_worker}")
+    if model_name not in whisper.available_models() and not os.path.isfile(model_name):
+        raise ValueError(f"Unknown whisper model \"{model_name}\", available models: {', '.join(whisper.available_models())}")
+    blacklist = load_blacklist(blacklist_path)
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    if checkpoint_path is None:
+        checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILENAME)
+    os.makedirs(output_dir, exist_ok=True)
+
+    files = collect_audio_files(source, exclude=(output_dir, checkpoint_path))
+    finished = load_checkpoint(checkpoint_path)
+    tasks = [(path, os.path.join(output_dir, name)) for path, name in files if path not in finished]
+    skipped = len(files) - len(tasks)
+    print(f"Found {len(files)} audio files, {skipped} already censored according to {checkpoint_path}.")
+
+    completed = 0
+    failed = 0
+    if tasks:
+        run_start = time.time()
+        # Spawn rather than fork so each worker gets a clean interpreter (and a
+        # clean CUDA context, if whisper ends up on the GPU).
+        context = multiprocessing.get_context("spawn")
+        _prepare_checkpoint(checkpoint_path)
+        with context.Pool(processes=workers, initializer=_init_worker, initargs=(model_name, blacklist, threads_per_worker)) as pool, \
+             open(checkpoint_path, "a") as cf:
+            for input_path, entry, error in pool.imap_unordered(_censor_file_task, tasks):
+                if error is None:
+                    # Only the parent process writes the checkpoint, one line per
+                    # file, flushed right away.
+                    cf.write(json.dumps(entry) + "\n")
+                    cf.flush()
+                    completed += 1
+                else:
+                    print(f"Failed to censor {input_path}: {error}")
+                    failed += 1
+                done = completed + failed
+                elapsed = time.time() - run_start
+                remaining = elapsed / done * (len(tasks) - done)
+                print(f"[{done}/{len(tasks)}] {input_path} -- {elapsed:.1f}s elapsed, ~{remaining:.1f}s remaining.")
+
+    print(f"Censored {completed} files ({skipped} skipped, {failed} failed).")
+    return {"completed": completed, "skipped": skipped, "failed": failed}
+
+def _positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Censor blacklisted words from a corpus of audio files.")
+    parser.add_argument("source", help="Directory of audio files, or a manifest with one audio file path per line.")
+    parser.add_argument("output_dir", help="Directory to write censored audio and detection JSON files to.")
+    parser.add_argument("--blacklist", default="banned_words.txt", help="File of blacklisted words, one per line.")
+    parser.add_argument("--model", default="base.en", help="Whisper model each worker loads.")
+    parser.add_argument("--workers", type=_positive_int, default=max(1, (os.cpu_count() or 1) // 2), help="Number of worker processes.")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint manifest path (default: <output_dir>/checkpoint.jsonl).")
+    parser.add_argument("--threads-per-worker", type=_positive_int, default=None, help="Torch threads per worker (default: cores / workers).")
+    args = parser.parse_args()
+
+    censor_corpus(source=args.source, output_dir=args.output_dir, blacklist_path=args.blacklist,
+                  model_name=args.model, workers=args.workers, checkpoint_path=args.checkpoint,
+                  threads_per_worker=args.threads_per_worker)
@@ -1,3 +1,4 @@
+import argparse
 import queue
 import threading
 import time
@@ -9,15 +10,18 @@ import numpy as np
 
 from whisper_transcribe import Transcriber
 from speechremover import bleep_audio_segments
+from policy import PolicyStore, DEFAULT_POLICY
 
 recording_queue = queue.Queue()
 playback_queue = queue.Queue()
 
+# Banned word policies, shared by every stream and reloaded when their files change.
+policy_store = PolicyStore()
+
 RECORDING_INTERVAL = 30
 SAMPLE_RATE = 16000
 CHANNELS = 1
 SAVE_FRAMES = False
-BANNING_PROBABILITY = 0.2
 BLOCKSIZE = RECORDING_INTERVAL*SAMPLE_RATE
 
 def record_audio():
@@ -105,69 +109,75 @@ def record_audio():
 		# PortAudio (Stream) thread that is going to put more data in the
 		# mic_callback_queue via the callback function.
 
-def process_audio():
+def process_audio(policy_name=DEFAULT_POLICY):
 	'''
 	Creates transcription from audio and "bleeps out" portions of the audio stream
 	that correspond with blacklisted words found in the transcription.
 	
 	Arguments:
-		None
+		policy_name -- Name of the banned word policy (see policies.json) this stream uses
 	Returns:
 		Modified audio segments with ID's pushed into shared processed audio queue.
 	'''
-	# Create transcriber instance.
-	transcriber = Transcriber()
-
-	# Load banned words list to scan later.
-	banned_words = []
-	with open('banned_words.txt', 'r') as f:
-		for line in f:
-			banned_words.append(line.strip())
-		f.close()
-
-	# Translator used to clean detected words for list queries
-	translator = str.maketrans('', '', string.punctuation)
-
-	while True:
-		# # Check if there is any audio in the recording queue. If so, read it,
-		# # transcribe it, and process it.
-		# if not recording_queue.empty():
-
-		# Get audio track from shared recording queue.
-		# Blocks by default until there is something to get from the queue.
-		track_id, audio = recording_queue.get()
-		print(f"Transcriber picked up audio track {track_id} -- transcribing now!")
-
-		# Transcribe audio track
-		transcription_start = time.time()
-		segments = transcriber.run_model_on_pcm(audio)
-		transcription_end = time.time()
-		print(f"Successfully transcribed audio segment {track_id} in {transcription_end-transcription_start}s.")
-		
-		print(f"Beginning censoring words in audio segment {track_id} now.")
-		censoring_start = time.time()
-		# Parse the start/end times of all banned word instances found in the
-		# transcript.
-		banned_word_segment_times = []
-		for segment in segments:
-			for word_dict in segment["words"]:
-				word = word_dict["word"].translate(translator).lower().strip()
-				if word in banned_words:
-					if word_dict['probability'] > BANNING_PROBABILITY:
-						banned_word_segment_times.append((word_dict['start'], word_dict['end']))
-						print(f"\tFound banned word \"{word}\" in audio at {word_dict['start']}-->{word_dict['end']}!")
-					else:
-						print(f"\tFound banned word \"{word}\" in audio at {word_dict['start']}-->{word_dict['end']}, but ignoring as confidence below threshold ({word_dict['probability']} < {BANNING_PROBABILITY}).")
-
-		# "Bleep out" banned portions of audio using speeechremover.
-		censored_audio = bleep_audio_segments(audio_ndarray=audio, audio_samplerate=SAMPLE_RATE, segment_times=banned_word_segment_times)
-		censoring_end = time.time()
-		print(f"Completed censoring of {len(banned_word_segment_times)} banned words in audio segment {track_id} in {censoring_end-censoring_start}s.")
-
-		# Add censored audio to the playback/output queue.
-		output_package = (track_id, censored_audio)
-		playback_queue.put(output_package)
-		print(f"Placed censored audio segment {track_id} into playback queue.")
+	# Register the stream's policy before the first block is transcribed, so a
+	# reload can't remove it while the stream is running.
+	policy = policy_store.acquire(policy_name)
+	try:
+		# Create transcriber instance.
+		transcriber = Transcriber()
+
+		# Translator used to clean detected words for list queries
+		translator = str.maketrans('', '', string.punctuation)
+
+		while True:
+			# # Check if there is any audio in the recording queue. If so, read it,
+			# # transcribe it, and process it.
+			# if not recording_queue.empty():
+
+			# Get audio track from shared recording queue.
+			# Blocks by default until there is something to get from the queue.
+			track_id, audio = recording_queue.get()
+			print(f"Transcriber picked up audio track {track_id} -- transcribing now!")
+
+			# Transcribe audio track
+			transcription_start = time.time()
+			segments = transcriber.run_model_on_pcm(audio)
+			transcription_end = time.time()
+			print(f"Successfully transcribed audio segment {track_id} in {transcription_end-transcription_start}s.")
+			
+			print(f"Beginning censoring words in audio segment {track_id} now.")
+			censoring_start = time.time()
+			# Fetch the policy for every block so that edits to the word lists take
+			# effect without restarting the stream. If that fails, keep censoring
+			# with the last good version rather than dropping the stream.
+			try:
+				policy = policy_store.get(policy_name)
+			except KeyError as e:
+				print(f"{e} -- continuing with the previous version of \"{policy_name}\".")
+			# Parse the start/end times of all banned word instances found in the
+			# transcript.
+			banned_word_segment_times = []
+			for segment in segments:
+				for word_dict in segment["words"]:
+					word = word_dict["word"].translate(translator).lower().strip()
+					if word in policy:
+						if word_dict['probability'] > policy.threshold:
+							banned_word_segment_times.append((word_dict['start'], word_dict['end']))
+							print(f"\tFound banned word \"{word}\" in audio at {word_dict['start']}-->{word_dict['end']}!")
+						else:
+							print(f"\tFound banned word \"{word}\" in audio at {word_dict['start']}-->{word_dict['end']}, but ignoring as confidence below threshold ({word_dict['probability']} < {policy.threshold}).")
+
+			# "Bleep out" banned portions of audio using speeechremover.
+			censored_audio = bleep_audio_segments(audio_ndarray=audio, audio_samplerate=SAMPLE_RATE, segment_times=banned_word_segment_times)
+			censoring_end = time.time()
+			print(f"Completed censoring of {len(banned_word_segment_times)} banned words in audio segment {track_id} in {censoring_end-censoring_start}s.")
+
+			# Add censored audio to the playback/output queue.
+			output_package = (track_id, censored_audio)
+			playback_queue.put(output_package)
+			print(f"Placed censored audio segment {track_id} into playback queue.")
+	finally:
+		policy_store.release(policy_name)
 
 def playback_audio():
 	'''
@@ -254,10 +264,16 @@ def playback_audio():
 	
 if __name__ == "__main__":
 
+	parser = argparse.ArgumentParser(description="Censor banned words from the microphone in real time.")
+	parser.add_argument("--policy", default=DEFAULT_POLICY, help="Banned word policy from policies.json to censor with.")
+	args = parser.parse_args()
+
 	try:
-		
+		# Fail before any audio is recorded if the policy doesn't exist.
+		policy_store.get(args.policy)
+
 		#Start threads
-		processing_thread = threading.Thread(target=process_audio)
+		processing_thread = threading.Thread(target=process_audio, args=(args.policy,))
 		processing_thread.daemon = True
 		processing_thread.start()
 
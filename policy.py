@@ -0,0 +1,257 @@
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_POLICY = "default"
+DEFAULT_THRESHOLD = 0.2
+
+class Policy():
+	'''
+	Immutable banned word policy. Word lists are kept as a tuple of frozensets that
+	may be shared with other policies, so a word list used by many policies (and
+	many streams) is only held in memory once.
+	'''
+	__slots__ = ("name", "indexes", "threshold")
+
+	def __init__(self, name, indexes, threshold):
+		object.__setattr__(self, "name", name)
+		object.__setattr__(self, "indexes", tuple(indexes))
+		object.__setattr__(self, "threshold", threshold)
+
+	def __setattr__(self, key, value):
+		raise AttributeError("Policy is immutable, reload the PolicyStore instead")
+
+	def __contains__(self, word):
+		for index in self.indexes:
+			if word in index:
+				return True
+		return False
+
+	def __repr__(self):
+		return f"Policy({self.name!r}, {sum(len(index) for index in self.indexes)} words, threshold={self.threshold})"
+
+class PolicyStore():
+	'''
+	Loads named banned word policies from a JSON config and hot-reloads them when
+	the config or any of the word list files it references change on disk.
+
+	The config maps policy names to the word list files they use and their
+	confidence threshold, e.g.
+		{"default": {"files": ["banned_words.txt"], "threshold": 0.2}}
+	A policy may also list extra inline "words". If the config file doesn't exist,
+	a single default policy is built from banned_words.txt.
+	'''
+	def __init__(self, config_path='policies.json', default_words_path='banned_words.txt', check_interval=1.0):
+		'''
+		Constructor for policy store, compiles all policies immediately
+		Arguments:
+			config_path -- JSON file defining the policies
+			default_words_path -- Word list used for the default policy when there is no config
+			check_interval -- Minimum number of seconds between checks for changed files
+		'''
+		self.config_path = config_path
+		self.default_words_path = default_words_path
+		self.check_interval = check_interval
+		self._reload_lock = threading.Lock()
+		self._last_check = 0.0
+		self._mtimes = {}
+		# Compiled word lists keyed by (path, mtime), shared between policies.
+		self._index_cache = {}
+		self._policies = {}
+		# Number of running streams per policy name, a reload may not remove these.
+		self._stream_counts = {}
+		self._streams_lock = threading.Lock()
+
+		# Unlike later reloads there are no previous policies to fall back on, so
+		# a broken config at startup is an error.
+		mtimes = {}
+		self._policies, self._index_cache = self._compile(mtimes)
+		self._mtimes = mtimes
+		print(f"Loaded banned word policies: {', '.join(repr(policy) for policy in self._policies.values())}")
+
+	def _mtime(self, path):
+		try:
+			return os.stat(path).st_mtime_ns
+		except FileNotFoundError:
+			return None
+
+	def _compile_words(self, words):
+		'''
+		Normalizes and interns words into an immutable index
+		Arguments:
+			words -- Iterable of raw words
+		Returns:
+			frozenset of words
+		'''
+		return frozenset(sys.intern(word.strip().lower()) for word in words if word.strip())
+
+	def _load_index(self, path, mtime):
+		key = (os.path.abspath(path), mtime)
+		index = self._index_cache.get(key)
+		if index is None:
+			with open(path, 'r') as f:
+				index = self._compile_words(f)
+			self._index_cache[key] = index
+		return index
+
+	def _read_config(self):
+		if self._mtime(self.config_path) is None:
+			return {DEFAULT_POLICY: {"files": [self.default_words_path], "threshold": DEFAULT_THRESHOLD}}
+		with open(self.config_path, 'r') as f:
+			return json.load(f)
+
+	def _string_list(self, name, spec, key):
+		'''
+		Reads an optional list of strings from a policy spec
+		Arguments:
+			name -- Name of the policy, for error messages
+			spec -- Policy spec from the config
+			key -- Key of the list in the spec
+		Returns:
+			List of strings, empty if the key is missing
+		'''
+		value = spec.get(key, [])
+		# A plain string would otherwise be iterated one character at a time.
+		if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+			raise ValueError(f"\"{key}\" of policy \"{name}\" must be a list of strings")
+		return value
+
+	def _compile(self, mtimes):
+		'''
+		Compiles every policy in the config, raising if the config is invalid
+		Arguments:
+			mtimes -- Dict that is filled with the mtimes of the files read
+		Returns:
+			Tuple of (dict of policies by name, index cache)
+		'''
+		mtimes[self.config_path] = self._mtime(self.config_path)
+		config = self._read_config()
+		if not isinstance(config, dict):
+			raise ValueError("policy config must be an object mapping policy names to policies")
+		index_cache = {}
+		policies = {}
+		for name, spec in config.items():
+			if not isinstance(spec, dict):
+				raise ValueError(f"policy \"{name}\" must be an object")
+			indexes = []
+			for path in self._string_list(name, spec, "files"):
+				mtime = self._mtime(path)
+				mtimes[path] = mtime
+				index = self._load_index(path, mtime)
+				index_cache[(os.path.abspath(path), mtime)] = index
+				indexes.append(index)
+			words = self._string_list(name, spec, "words")
+			if words:
+				indexes.append(self._compile_words(words))
+			policies[name] = Policy(name, indexes, float(spec.get("threshold", DEFAULT_THRESHOLD)))
+		return policies, index_cache
+
+	def reload(self):
+		'''
+		Recompiles every policy and atomically swaps them in. If the new config can't
+		be loaded, or it drops a policy a stream is using, the previous policies are
+		kept.
+		Arguments:
+			None
+		Returns:
+			True if the policies were replaced, otherwise False
+		'''
+		with self._reload_lock:
+			mtimes = {}
+			try:
+				policies, index_cache = self._compile(mtimes)
+			except (OSError, ValueError, TypeError, AttributeError) as e:
+				print(f"Failed to load banned word policies, keeping previous policies: {e}")
+				# Don't retry until the offending files change again.
+				self._mtimes.update(mtimes)
+				return False
+
+			# Held until the swap, so no stream can acquire a policy that is about
+			# to disappear.
+			with self._streams_lock:
+				missing = set(self._stream_counts).difference(policies)
+				if missing:
+					print(f"Failed to load banned word policies, keeping previous policies: policies in use by streams are missing: {', '.join(sorted(missing))}")
+					self._mtimes.update(mtimes)
+					return False
+
+				# Single reference assignment, so readers always see either the old
+				# or the new set of policies.
+				self._policies = policies
+			self._index_cache = index_cache
+			self._mtimes = mtimes
+			print(f"Loaded banned word policies: {', '.join(repr(policy) for policy in policies.values())}")
+			return True
+
+	def check_for_changes(self):
+		'''
+		Reloads the policies if any watched file changed, at most once per check_interval
+		Arguments:
+			None
+		Returns:
+			True if the policies were reloaded, otherwise False
+		'''
+		now = time.monotonic()
+		if now - self._last_check < self.check_interval:
+			return False
+		self._last_check = now
+
+		# The config file may have been created since the last load.
+		if self._mtime(self.config_path) != self._mtimes.get(self.config_path):
+			return self.reload()
+		for path, mtime in list(self._mtimes.items()):
+			if self._mtime(path) != mtime:
+				return self.reload()
+		return False
+
+	def get(self, name=DEFAULT_POLICY):
+		'''
+		Returns the current version of a policy, reloading first if files changed
+		Arguments:
+			name -- Name of the policy
+		Returns:
+			Policy instance
+		'''
+		self.check_for_changes()
+		policies = self._policies
+		if name not in policies:
+			raise KeyError(f"Unknown banned word policy \"{name}\", available policies: {', '.join(policies)}")
+		return policies[name]
+
+	def acquire(self, name=DEFAULT_POLICY):
+		'''
+		Registers a running stream as using a policy, reloads that would remove the
+		policy are rejected until the stream calls release
+		Arguments:
+			name -- Name of the policy
+		Returns:
+			Policy instance
+		'''
+		self.check_for_changes()
+		# Only look the policy up under the streams lock, get may reload and the
+		# reload lock must never be taken while holding it.
+		with self._streams_lock:
+			policies = self._policies
+			if name not in policies:
+				raise KeyError(f"Unknown banned word policy \"{name}\", available policies: {', '.join(policies)}")
+			self._stream_counts[name] = self._stream_counts.get(name, 0) + 1
+			return policies[name]
+
+	def release(self, name=DEFAULT_POLICY):
+		'''
+		Unregisters a stream previously registered with acquire
+		Arguments:
+			name -- Name of the policy
+		Returns:
+			None
+		'''
+		with self._streams_lock:
+			count = self._stream_counts.get(name, 0) - 1
+			if count > 0:
+				self._stream_counts[name] = count
+			else:
+				self._stream_counts.pop(name, None)
+				# A config that was rejected because of this stream gets another try.
+				self._mtimes = {path: mtime for path, mtime in self._mtimes.items() if path != self.config_path}
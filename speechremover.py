@@ -136,8 +136,38 @@ def bleep_audio_segments(audio_ndarray: np.ndarray, audio_samplerate: int, segme
         audio_ndarray = bleep_audio_segment(audio_ndarray=audio_ndarray, audio_samplerate=audio_samplerate, start_timestamp=start_timestamp, end_timestamp=end_timestamp)
     return audio_ndarray
 
+def find_blacklisted_words(segments: list, blacklist) -> list:
+    """Function that scans whisper transcription segments for blacklisted words.
+
+    Parameters
+    ----------
+    segments: list
+        The "segments" list returned by whisper's transcribe (with
+        word_timestamps=True).
+    blacklist: Container(str)
+        Words that should be censored. A set is preferable for large lists.
+
+    Returns
+    ----------
+    A list of dicts (word, start, end, probability), one for each blacklisted
+    word found in the transcription.
+    """
+
+    # Translator used to clean detected words for list queries
+    translator = str.maketrans('', '', string.punctuation)
+
+    detections = []
+    for segment in segments:
+        for word_dict in segment["words"]:
+            word = word_dict["word"].translate(translator).lower().strip()
+            if word in blacklist:
+                print(f"\tFound blacklisted word \"{word}\" in audio at {word_dict['start']}-->{word_dict['end']}!")
+                detections.append({"word": word, "start": word_dict["start"], "end": word_dict["end"],
+                                   "probability": word_dict.get("probability")})
+    return detections
+
 def censor_original_audio(original_audio: np.ndarray, original_audio_samplerate: int, model_audio: np.ndarray, model_audio_samplerate: int,
-                          blacklist: list):
+                          blacklist: list, model=None, return_detections: bool = False):
     """Function that bleeps out portions of the original_audio based on blacklisted
     words transcribed from the provided model_audio.
     
@@ -154,17 +184,24 @@ def censor_original_audio(original_audio: np.ndarray, original_audio_samplerate:
         The sample rate of the downsampled model audio.
     blacklist: List(str)
         List of words that should be censored/removed/replaced in the audio.
+    model: optional
+        An already loaded whisper model. If not provided, "base.en" is loaded for
+        this call only--pass one in when censoring many files.
+    return_detections: bool
+        If True, also return the list of detections from find_blacklisted_words.
     
     Returns
     ----------
     An ndarray of the ORIGINAL audio with regions corresponding to blacklisted words
-    "bleeped out."
+    "bleeped out." If return_detections is True, a tuple of (censored audio,
+    detections).
     """
 
     print("Beginning transcription process on audio")
     transcribe_start = time.time()
     # First, run audio ndarray through whisper to get transcription.
-    model = whisper.load_model("base.en")
+    if model is None:
+        model = whisper.load_model("base.en")
     results = model.transcribe(model_audio, word_timestamps=True)
     transcribe_end = time.time()
     print(f"Transcription completed in {transcribe_end - transcribe_start}s!")
@@ -178,20 +215,11 @@ def censor_original_audio(original_audio: np.ndarray, original_audio_samplerate:
             print(word)
     print()
 
-    # Translator used to clean detected words for list queries
-    translator = str.maketrans('', '', string.punctuation)
-
     print("Searching for blacklisted words in transcription")
     # Parse results for blacklisted words. Append their start and end timestamps as
     # tuples as you find them.
-    blacklisted_segment_times = []
-    segments = results["segments"]
-    for segment in segments:
-        for word_dict in segment["words"]:
-            word = word_dict["word"].translate(translator).lower().strip()
-            if word in blacklist:
-                print(f"\tFound blacklisted word \"{word}\" in audio at {word_dict['start']}-->{word_dict['end']}!")
-                blacklisted_segment_times.append((word_dict["start"], word_dict["end"]))
+    detections = find_blacklisted_words(results["segments"], blacklist)
+    blacklisted_segment_times = [(detection["start"], detection["end"]) for detection in detections]
     print()
 
     # Now, pass that list onto another function to remove it from the original audio.
@@ -201,6 +229,8 @@ def censor_original_audio(original_audio: np.ndarray, original_audio_samplerate:
     censor_end = time.time()
     print(f"Censoring complete! It took {censor_end - censor_start}s to censor {len(blacklisted_segment_times)} blacklisted words from the provided audio.")
 
+    if return_detections:
+        return censored_audio, detections
     return censored_audio
 
 
@@ -1,13 +1,30 @@
 import whisper
 import time
 import numpy as np
+from whisper.tokenizer import get_tokenizer
+
+# Same cutoff whisper uses internally to stop conditioning on text decoded at a
+# high fallback temperature, which is likely to be a hallucination.
+PROMPT_RESET_TEMPERATURE = 0.5
 
 class Transcriber():
 	'''
 	Transcription class that runs OpenAI Whisper model and converts raw PCM data to labeled text segments
 	'''
-	def __init__(self):
+	def __init__(self, carry_context=True):
+		'''
+		Constructor for transcriber
+		Arguments:
+			carry_context -- Prompt each block with the text of the previous block from the same stream
+		'''
 		self.model = whisper.load_model("tiny.en")
+		self.tokenizer = get_tokenizer(self.model.is_multilingual)
+		# Whisper only keeps the last n_text_ctx // 2 - 1 tokens of a prompt,
+		# anything older would be trimmed inside the decoder anyway.
+		self.max_prompt_tokens = self.model.dims.n_text_ctx // 2 - 1
+		self.carry_context = carry_context
+		# Rolling prompt tokens from the previous block, keyed by stream id.
+		self._contexts = {}
 
 	def _format_pcm(self, pcm):
 		'''
@@ -22,18 +39,64 @@ class Transcriber():
 
 		return audio
 
-	def run_model_on_pcm(self, pcm):
+	def _context_tokens(self, segments):
+		'''
+		Extracts the text tokens of a block's segments to prompt the next block with
+		Arguments:
+			segments -- Segments returned by whisper for the block
+		Returns:
+			Tuple of (list of at most max_prompt_tokens text tokens, whether the context was reset)
+		'''
+		tokens = []
+		reset = False
+		for segment in segments:
+			if segment.get("temperature", 0.0) > PROMPT_RESET_TEMPERATURE:
+				tokens = []
+				reset = True
+				continue
+			# Drop timestamp and other special tokens, only the text is carried over.
+			tokens.extend(token for token in segment["tokens"] if token < self.tokenizer.eot)
+
+		return tokens[-self.max_prompt_tokens:], reset
+
+	def reset_context(self, stream_id=None):
+		'''
+		Forgets the carried over context of a stream, e.g. when it restarts
+		Arguments:
+			stream_id -- Stream to reset
+		Returns:
+			None
+		'''
+		self._contexts.pop(stream_id, None)
+
+	def run_model_on_pcm(self, pcm, stream_id=None):
 		'''
 		Runs whisper model on raw PCM data and returns labeled words within audio segment
 		Arguments:
 			pcm -- Raw PCM data frame
+			stream_id -- Stream the block belongs to, consecutive blocks of a stream share context
 		Returns:
 			Array of segments of labeled words
 		'''
 		audio = self._format_pcm(pcm)
 
+		prompt = None
+		if self.carry_context:
+			context_tokens = self._contexts.get(stream_id)
+			if context_tokens:
+				prompt = self.tokenizer.decode(context_tokens)
+
 		transcribe_start = time.time()
-		results = self.model.transcribe(audio, word_timestamps=True)
+		results = self.model.transcribe(audio, word_timestamps=True, initial_prompt=prompt)
 		transcribe_end = time.time()
 
-		return results["segments"]
\ No newline at end of file
+		if self.carry_context:
+			# A block without segments keeps the older context, but a reset (like in
+			# whisper) means the next block starts without a prompt.
+			context_tokens, reset = self._context_tokens(results["segments"])
+			if context_tokens:
+				self._contexts[stream_id] = context_tokens
+			elif reset:
+				self.reset_context(stream_id)
+
+		return results["segments"]